@@ -7,14 +7,11 @@ Original file is located at
     https://colab.research.google.com/drive/1EzcB4ZzHNV4z9AdEQH5XDt1Xsp8mOhDG
 """
 
-!pip install numpy matplotlib mesa==3.0 -q
+!pip install numpy matplotlib mesa==3.0 orjson -q
 !pip install --pre mesa[viz] -q
 
 # ==== DEPENDENCIAS ====
 from mesa import Agent, Model
-from mesa.space import MultiGrid
-from mesa.time import RandomActivation
-from mesa.datacollection import DataCollector
 
 import matplotlib
 import matplotlib.pyplot as plt
@@ -23,6 +20,7 @@ from IPython.display import HTML
 import numpy as np
 from collections import defaultdict, Counter
 import json
+import orjson
 from pathlib import Path
 
 from collections import defaultdict, Counter, deque
@@ -83,7 +81,7 @@ class SimLogger:
 
         # Agents
         agents = []
-        for a in model.schedule.agents:
+        for a in model.agent_list:
             if getattr(a, "pos", None) is not None:
                 agents.append(
                     {"id": str(a.unique_id), "r": a.pos[1] + 1, "c": a.pos[0] + 1})
@@ -92,7 +90,7 @@ class SimLogger:
 
         if include_pois:
             pois = []
-            for (x, y), contents in model.cell_contents.items():
+            for (x, y), contents in model.iter_cell_contents():
                 if any(isinstance(c, Hostage) for c in contents):
                     pois.append({"r": y + 1, "c": x + 1, "kind": "v"})
                 elif any(isinstance(c, FalseAlarm) for c in contents):
@@ -101,7 +99,7 @@ class SimLogger:
 
         if include_riots:
             riots = []
-            for (x, y), contents in model.cell_contents.items():
+            for (x, y), contents in model.iter_cell_contents():
                 d = next((c for c in contents if isinstance(c, Disturbance)), None)
                 if d:
                     riots.append(
@@ -110,7 +108,7 @@ class SimLogger:
 
         if include_doors:
             doors = []
-            for (x, y), contents in model.cell_contents.items():
+            for (x, y), contents in model.iter_cell_contents():
                 for g in contents:
                     if isinstance(g, Gate):
                         doors.append(
@@ -139,6 +137,8 @@ class SimLogger:
 class Hostage:
     """Rehén (objeto pasivo)."""
 
+    __slots__ = ("unique_id",)
+
     def __init__(self, unique_id):
         self.unique_id = unique_id
 
@@ -146,6 +146,8 @@ class Hostage:
 class FalseAlarm:
     """Falsa alarma (objeto pasivo)."""
 
+    __slots__ = ("unique_id",)
+
     def __init__(self, unique_id):
         self.unique_id = unique_id
 
@@ -153,6 +155,8 @@ class FalseAlarm:
 class Gate:
     """Reja/puerta en una celda (simplificación)."""
 
+    __slots__ = ("unique_id", "is_open")
+
     def __init__(self, unique_id, is_open=False):
         self.unique_id = unique_id
         self.is_open = is_open
@@ -161,11 +165,28 @@ class Gate:
 class Disturbance:
     """Disturbio (riot) con severidad."""
 
+    __slots__ = ("unique_id", "severity", "turns_in_current_state")
+
     def __init__(self, unique_id, severity='mild'):
         self.unique_id = unique_id
         self.severity = severity  # 'mild', 'active', 'grave'
         self.turns_in_current_state = 0
 
+# ------------------------------------------------------------
+#                    MUROS (BITS POR CELDA)
+# ------------------------------------------------------------
+# RescueModel.wall_bits[x, y] guarda los muros de cada celda como bits,
+# en el mismo orden que el código "abcd" de config (up,left,down,right).
+WALL_TOP, WALL_LEFT, WALL_BOTTOM, WALL_RIGHT = 1, 2, 4, 8
+
+# (dx, dy) -> (bit en la celda origen, bit opuesto en la celda vecina)
+WALL_MASKS = {
+    (1, 0): (WALL_RIGHT, WALL_LEFT),
+    (-1, 0): (WALL_LEFT, WALL_RIGHT),
+    (0, 1): (WALL_BOTTOM, WALL_TOP),
+    (0, -1): (WALL_TOP, WALL_BOTTOM),
+}
+
 # ------------------------------------------------------------
 #                     RENDER DE LA CUADRÍCULA
 # ------------------------------------------------------------
@@ -175,67 +196,13 @@ def get_grid(model):
     - Shape = (height*2+1, width*2+1)  -> [filas(Y), columnas(X)]
     - Celdas "centro" en (y*2+1, x*2+1)
     - Muros (top/left/bottom/right) en segmentos vecinos.
+    La capa de muros viene precalculada en model.wall_canvas (solo cambia
+    en break_wall_between) y los centros se copian de model.grid_state.
     """
-    H = model.grid.height
-    W = model.grid.width
-    canvas = np.zeros((H * 2 + 1, W * 2 + 1), dtype=np.int32)
-
-    # Muros por celda
-    for (x, y), walls in model.walls.items():
-        cy, cx = y * 2 + 1, x * 2 + 1  # (fila, col) en canvas
-
-        if walls.get('top', False):
-            canvas[cy - 1, cx] = 1
-        if walls.get('bottom', False):
-            canvas[cy + 1, cx] = 1
-        if walls.get('left', False):
-            canvas[cy, cx - 1] = 1
-        if walls.get('right', False):
-            canvas[cy, cx + 1] = 1
-
-    # Borde exterior (opcional)
-    canvas[0, :] = 1
-    canvas[-1, :] = 1
-    canvas[:, 0] = 1
-    canvas[:, -1] = 1
-
-    # Objetos/POIs/puertas (centro de celda)
-    for (x, y), contents in model.cell_contents.items():
-        cy, cx = y * 2 + 1, x * 2 + 1
-
-        # Prioridad por tipo (si quieres otra, ajusta)
-        if any(isinstance(c, Hostage) for c in contents):
-            canvas[cy, cx] = 3
-            continue
-
-        if any(isinstance(c, Disturbance) for c in contents):
-            d = next(c for c in contents if isinstance(c, Disturbance))
-            canvas[cy, cx] = 8 if d.severity == 'grave' else (
-                5 if d.severity == 'active' else 4)
-            continue
-
-        if any(isinstance(c, FalseAlarm) for c in contents):
-            canvas[cy, cx] = 7
-            continue
-
-        if any(isinstance(c, Gate) for c in contents):
-            g = next(c for c in contents if isinstance(c, Gate))
-            canvas[cy, cx] = 9 if g.is_open else 10
-            continue
-
-    # Entradas (si el centro está vacío)
-    for (ex, ey) in getattr(model, "entry_points", []):
-        cy, cx = ey * 2 + 1, ex * 2 + 1
-        if canvas[cy, cx] == 0:
-            canvas[cy, cx] = 6
-
-    # Agentes al final (para que se vean encima)
-    for agent in model.schedule.agents:
-        if getattr(agent, "pos", None) is None:
-            continue
-        x, y = agent.pos
-        cy, cx = y * 2 + 1, x * 2 + 1
-        canvas[cy, cx] = 2
+    canvas = model.wall_canvas.copy()
+
+    # Objetos/POIs/puertas/entradas/agentes (centro de celda)
+    canvas[1::2, 1::2] = model.grid_state
 
     return canvas
 
@@ -254,45 +221,10 @@ def get_grid_board(model):
       9 = reja abierta
      10 = reja cerrada
     Nota: NO dibuja muros (pero la lógica sí los respeta al mover).
+    El modelo mantiene el tablero al día en model.grid_state, ya en orden
+    [fila, col] (ver RescueModel.refresh_cell); aquí solo se copia.
     """
-    H, W = model.grid.height, model.grid.width
-    M = np.zeros((H, W), dtype=np.int32)
-
-    # puntos de entrada (si no hay algo encima)
-    for (ex, ey) in getattr(model, "entry_points", []):
-        if M[ey, ex] == 0:
-            M[ey, ex] = 6
-
-    # objetos (rehén, disturbio, falsa, puerta)
-    for (x, y), contents in model.cell_contents.items():
-        # prioridad:
-        if any(isinstance(c, Hostage) for c in contents):
-            M[y, x] = 3
-            continue
-
-        if any(isinstance(c, Disturbance) for c in contents):
-            d = next(c for c in contents if isinstance(c, Disturbance))
-            M[y, x] = 8 if d.severity == "grave" else (
-                5 if d.severity == "active" else 4)
-            continue
-
-        if any(isinstance(c, FalseAlarm) for c in contents):
-            M[y, x] = 7
-            continue
-
-        if any(isinstance(c, Gate) for c in contents):
-            g = next(c for c in contents if isinstance(c, Gate))
-            M[y, x] = 9 if g.is_open else 10
-            continue
-
-    # agentes encima de todo
-    for a in model.schedule.agents:
-        if getattr(a, "pos", None) is None:
-            continue
-        x, y = a.pos
-        M[y, x] = 2
-
-    return M
+    return model.grid_state.copy()
 
 
 
@@ -349,7 +281,7 @@ class TacticalAgent(Agent):
             return False
 
         # If already at entry point, drop off hostage
-        if self.pos in self.model.entry_points:
+        if self.pos in self.model.entry_points_set:
             if self.action_points >= 1:
                 self.carrying_hostage = False
                 self.model.hostages_rescued += 1
@@ -361,7 +293,7 @@ class TacticalAgent(Agent):
             return False
 
         # Find path to nearest entry point
-        if not self.current_path or self.current_goal not in self.model.entry_points:
+        if not self.current_path or self.current_goal not in self.model.entry_points_set:
             nearest_entry = self._find_nearest_entry_point()
             if nearest_entry:
                 self.current_path = self.model.dijkstra_path(self.pos, nearest_entry)
@@ -377,8 +309,7 @@ class TacticalAgent(Agent):
             return False
 
         # Check if hostage in current cell
-        current_contents = self.model.get_contents_at(self.pos)
-        hostage_found = next((c for c in current_contents if isinstance(c, Hostage)), None)
+        hostage_found = self.model.find_first(self.pos, Hostage)
 
         if hostage_found and self.action_points >= 2:
             # Rescue hostage
@@ -414,8 +345,7 @@ class TacticalAgent(Agent):
     def _contain_disturbance(self):
         """Contain disturbances"""
         # Check if disturbance in current cell
-        current_contents = self.model.get_contents_at(self.pos)
-        disturbance_found = next((c for c in current_contents if isinstance(c, Disturbance)), None)
+        disturbance_found = self.model.find_first(self.pos, Disturbance)
 
         if disturbance_found:
             required_points = 1 if disturbance_found.severity == 'mild' else (2 if disturbance_found.severity == 'active' else 999)
@@ -449,8 +379,7 @@ class TacticalAgent(Agent):
     def _investigate_alarm(self):
         """Investigate false alarms"""
         # Check if alarm in current cell
-        current_contents = self.model.get_contents_at(self.pos)
-        alarm_found = next((c for c in current_contents if isinstance(c, FalseAlarm)), None)
+        alarm_found = self.model.find_first(self.pos, FalseAlarm)
 
         if alarm_found and self.action_points >= 1:
             self.model.reveal_if_needed(self.pos)
@@ -509,17 +438,14 @@ class TacticalAgent(Agent):
             return False
 
         # Calculate movement cost
-        next_contents = self.model.get_contents_at(next_pos)
-        cost = 1
-        for content in next_contents:
-            if isinstance(content, Disturbance):
-                cost = 2
-                break
+        cost = 2 if self.model.find_first(next_pos, Disturbance) else 1
 
         if self.action_points >= cost:
             # Execute move
             from_pos = self.pos
-            self.model.grid.move_agent(self, next_pos)
+            self.model.move_agent(self, next_pos)
+            self.model.refresh_cell(from_pos)
+            self.model.refresh_cell(next_pos)
             if hasattr(self.model, "logger"):
                 self.model.logger.move(
                     self.unique_id, from_pos, next_pos, t=self.model.turn_counter + 1
@@ -545,18 +471,17 @@ class TacticalAgent(Agent):
 
     def _handle_miscellaneous_actions(self):
         """Handle gates, walls, and other miscellaneous actions"""
-        current_contents = self.model.get_contents_at(self.pos)
-
         # Handle gates
-        gate_found = next((c for c in current_contents if isinstance(c, Gate)), None)
+        gate_found = self.model.find_first(self.pos, Gate)
         if gate_found and self.action_points >= 1:
             gate_found.is_open = not gate_found.is_open
+            self.model.refresh_cell(self.pos)
             self.action_points -= 1
             return True
 
         # Break walls if necessary (as last resort)
         if self.action_points >= 2:
-            neighbors = self.model.grid.get_neighborhood(self.pos, moore=False, include_center=False)
+            neighbors = self.model.neighbor_table[self.pos[0]][self.pos[1]]
             for neighbor_pos in neighbors:
                 if self.model.has_wall_between(self.pos, neighbor_pos):
                     self.model.break_wall_between(self.pos, neighbor_pos)
@@ -585,7 +510,7 @@ class TacticalAgent(Agent):
         min_distance = float('inf')
         nearest_pos = None
 
-        for pos, contents in self.model.cell_contents.items():
+        for pos, contents in self.model.iter_cell_contents():
             if any(isinstance(c, Hostage) for c in contents):
                 distance = self.model.dijkstra_distance(self.pos, pos)
                 if distance < min_distance:
@@ -599,7 +524,7 @@ class TacticalAgent(Agent):
         min_distance = float('inf')
         nearest_pos = None
 
-        for pos, contents in self.model.cell_contents.items():
+        for pos, contents in self.model.iter_cell_contents():
             for content in contents:
                 if isinstance(content, Disturbance) and content.severity in ['mild', 'active']:
                     distance = self.model.dijkstra_distance(self.pos, pos)
@@ -614,7 +539,7 @@ class TacticalAgent(Agent):
         min_distance = float('inf')
         nearest_pos = None
 
-        for pos, contents in self.model.cell_contents.items():
+        for pos, contents in self.model.iter_cell_contents():
             if any(isinstance(c, FalseAlarm) for c in contents):
                 distance = self.model.dijkstra_distance(self.pos, pos)
                 if distance < min_distance:
@@ -628,13 +553,13 @@ class TacticalAgent(Agent):
         # Simple exploration: find empty cells that might contain hidden POIs
         potential_targets = []
 
-        for x in range(self.model.grid.width):
-            for y in range(self.model.grid.height):
+        for x in range(self.model.width):
+            for y in range(self.model.height):
                 pos = (x, y)
-                contents = self.model.get_contents_at(pos)
+                agents, contents = self.model.get_contents_at(pos)
 
                 # Target empty cells or cells with only gates
-                if not contents or all(isinstance(c, Gate) for c in contents):
+                if not agents and all(isinstance(c, Gate) for c in contents):
                     if pos not in self.model.revealed_pois:
                         potential_targets.append(pos)
 
@@ -658,14 +583,13 @@ class TacticalAgent(Agent):
         """Check if current goal contains a hostage"""
         if not self.current_goal:
             return False
-        contents = self.model.get_contents_at(self.current_goal)
-        return any(isinstance(c, Hostage) for c in contents)
+        return self.model.find_first(self.current_goal, Hostage) is not None
 
     def _is_goal_disturbance(self):
         """Check if current goal contains a containable disturbance"""
         if not self.current_goal:
             return False
-        contents = self.model.get_contents_at(self.current_goal)
+        _, contents = self.model.get_contents_at(self.current_goal)
         for content in contents:
             if isinstance(content, Disturbance) and content.severity in ['mild', 'active']:
                 return True
@@ -675,28 +599,47 @@ class TacticalAgent(Agent):
         """Check if current goal contains a false alarm"""
         if not self.current_goal:
             return False
-        contents = self.model.get_contents_at(self.current_goal)
-        return any(isinstance(c, FalseAlarm) for c in contents)
+        return self.model.find_first(self.current_goal, FalseAlarm) is not None
 
     def _is_exploring(self):
         """Check if currently exploring"""
         return self.current_task == "exploring"
 
+# U(0,1) que se pre-muestrean de una vez con numpy (ver RescueModel.next_u01)
+U01_BATCH = 4096
+
+# (config resuelto, mtime) -> (cfg, disposición estática); ver RescueModel._load_layout
+_LAYOUT_CACHE = {}
+
 # ------------------------------------------------------------
 #                     ENHANCED RESCUE MODEL
 # ------------------------------------------------------------
 class RescueModel(Model):
-    def __init__(self, config_path="config.json"):
-        super().__init__()
-        cfg = self._load_config(config_path)
+    def __init__(self, config_path="config.json", seed=None):
+        super().__init__(seed=seed)
+        cfg, layout = self._load_layout(config_path)
 
         rows = cfg["rows"]  # filas = alto
         cols = cfg["cols"]  # columnas = ancho
 
-        # width = cols, height = rows (Mesa)
-        self.grid = MultiGrid(cols, rows, torus=False)
-        self.schedule = RandomActivation(self)
-        self.cell_contents = defaultdict(list)
+        # ancho = cols, alto = rows
+        self.width, self.height = cols, rows
+        # agentes tácticos por celda, indexados por cell_id(pos) (ver place_agent / move_agent)
+        self.agent_cells = [[] for _ in range(cols * rows)]
+        self.agent_list = []  # agentes tácticos; se barajan en cada tick (ver step)
+        # entidades pasivas por celda, indexadas por cell_id(pos) = x * alto + y
+        self.cell_contents = [[] for _ in range(cols * rows)]
+        # código de tablero por celda [y, x] (ver get_grid_board / refresh_cell)
+        self.grid_state = np.zeros((rows, cols), dtype=np.int8)
+        # celdas de grid_state cambiadas en el tick en curso: (y, x) -> código
+        self._frame_delta = {}
+        # disturbios vivos -> posición, en orden de aparición (ver advance_disturbances)
+        self.disturbance_pos = {}
+        # U(0,1) por lotes para las decisiones uniformes frecuentes; la semilla
+        # sale de self.random para que una corrida con seed siga siendo reproducible
+        self._u01_rng = np.random.default_rng(self.random.getrandbits(64))
+        self._u01 = []
+        self._u01_i = 0
         self.running = True
 
         # Métricas
@@ -709,9 +652,7 @@ class RescueModel(Model):
         self.min_hidden_markers = 3
 
         # --- Construcción desde config ---
-        self.walls = {}
-        self.entry_points = []
-        self._build_from_config(cfg)
+        self._build_from_config(cfg, layout)
 
         # Logger
         self.logger = SimLogger()
@@ -725,27 +666,33 @@ class RescueModel(Model):
         # Agentes iniciales (6) en entradas
         for _ in range(6):
             a = TacticalAgent(self.get_next_id(), self)
-            self.schedule.add(a)
+            self.agent_list.append(a)
             ep = self.random.choice(self.entry_points)
-            self.grid.place_agent(a, ep)
+            self.place_agent(a, ep)
+
+        # Tablero inicial; de aquí en adelante se actualiza celda por celda
+        for x in range(cols):
+            for y in range(rows):
+                self.refresh_cell((x, y))
 
         # Log de spawns
-        for a in self.schedule.agents:
+        for a in self.agent_list:
             if getattr(a, "pos", None) is not None:
                 r, c = a.pos[1] + 1, a.pos[0] + 1
                 self.logger.spawn_agent(a.unique_id, r, c, t=0)
 
         # Stats iniciales
-        self.initial_hostages = sum(1 for cont in self.cell_contents.values()
+        self.initial_hostages = sum(1 for cont in self.cell_contents
                                     for it in cont if isinstance(it, Hostage))
-        self.initial_alarms = sum(1 for cont in self.cell_contents.values()
+        self.initial_alarms = sum(1 for cont in self.cell_contents
                                   for it in cont if isinstance(it, FalseAlarm))
-        self.initial_disturbances = sum(1 for cont in self.cell_contents.values()
+        self.initial_disturbances = sum(1 for cont in self.cell_contents
                                         for it in cont if isinstance(it, Disturbance))
 
-        self.datacollector = DataCollector(
-            model_reporters={"Grid": lambda m: np.array(self.get_grid_board())}
-        )
+        # Animación: tablero base (tick 0) + celdas cambiadas por tick (ver replay_frames)
+        self.frame_base = get_grid_board(self)
+        self.frame_deltas = []
+        self._frame_delta = {}
 
         # Snapshot inicial (t=0)
         self.logger.snapshot_tick(
@@ -773,24 +720,18 @@ class RescueModel(Model):
             if current_pos == goal:
                 return path
 
-            # Get neighbors
-            neighbors = self.grid.get_neighborhood(current_pos, moore=False, include_center=False)
+            # Get neighbors (walls of the current cell block directly)
+            walls_here = int(self.wall_bits[current_pos])
 
-            for neighbor in neighbors:
-                if neighbor in visited:
+            for neighbor, wall in self.neighbor_walls[current_pos[0]][current_pos[1]]:
+                if neighbor in visited or walls_here & wall:
                     continue
 
-                if not self.can_move_to(current_pos, neighbor):
+                # Calculate movement cost (None = closed gate)
+                movement_cost = self.entry_cost(neighbor)
+                if movement_cost is None:
                     continue
 
-                # Calculate movement cost
-                neighbor_contents = self.get_contents_at(neighbor)
-                movement_cost = 1
-                for content in neighbor_contents:
-                    if isinstance(content, Disturbance):
-                        movement_cost = 2
-                        break
-
                 new_dist = current_dist + movement_cost
                 new_path = path + [neighbor]
 
@@ -825,24 +766,18 @@ class RescueModel(Model):
                 self._distance_cache[cache_key] = current_dist
                 return current_dist
 
-            # Get neighbors
-            neighbors = self.grid.get_neighborhood(current_pos, moore=False, include_center=False)
+            # Get neighbors (walls of the current cell block directly)
+            walls_here = int(self.wall_bits[current_pos])
 
-            for neighbor in neighbors:
-                if neighbor in visited:
+            for neighbor, wall in self.neighbor_walls[current_pos[0]][current_pos[1]]:
+                if neighbor in visited or walls_here & wall:
                     continue
 
-                if not self.can_move_to(current_pos, neighbor):
+                # Calculate movement cost (None = closed gate)
+                movement_cost = self.entry_cost(neighbor)
+                if movement_cost is None:
                     continue
 
-                # Calculate movement cost
-                neighbor_contents = self.get_contents_at(neighbor)
-                movement_cost = 1
-                for content in neighbor_contents:
-                    if isinstance(content, Disturbance):
-                        movement_cost = 2
-                        break
-
                 new_dist = current_dist + movement_cost
 
                 if neighbor not in distances or new_dist < distances[neighbor]:
@@ -864,6 +799,16 @@ class RescueModel(Model):
         with path.open("r", encoding="utf-8") as f:
             return json.load(f)
 
+    def _load_layout(self, path):
+        """cfg y su parte estática, leídos y calculados una sola vez por archivo."""
+        path = Path(path).resolve()
+        key = (path, path.stat().st_mtime_ns)
+        cached = _LAYOUT_CACHE.get(key)
+        if cached is None:
+            cfg = self._load_config(path)
+            cached = _LAYOUT_CACHE[key] = (cfg, self._build_layout(cfg))
+        return cached
+
     def _parse_cells(self, cfg):
         if "cells" in cfg and cfg["cells"]:
             return cfg["cells"]
@@ -882,10 +827,12 @@ class RescueModel(Model):
                 f"Se recibieron {len(out)} filas; se esperaban {rows}.")
         return out
 
-    def _build_from_config(self, cfg):
+    def _build_layout(self, cfg):
+        """Muros, capa de muros, vecinos y entradas; no depende de la partida."""
         # Paredes
         cells = self._parse_cells(cfg)
         rows, cols = cfg["rows"], cfg["cols"]
+        wall_bits = np.zeros((cols, rows), dtype=np.uint8)  # WALL_* por celda [x, y]
         for r in range(rows):
             for c in range(cols):
                 code = cells[r][c]
@@ -893,41 +840,90 @@ class RescueModel(Model):
                     raise ValueError(
                         f"Celda ({r},{c}) código inválido: {code}")
                 x, y = c, r
-                self.walls[(x, y)] = {
-                    "top":    code[0] == "1",
-                    "left":   code[1] == "1",
-                    "bottom": code[2] == "1",
-                    "right":  code[3] == "1",
-                }
+                wall_bits[x, y] = sum(
+                    bit for ch, bit in zip(code, (WALL_TOP, WALL_LEFT, WALL_BOTTOM, WALL_RIGHT))
+                    if ch == "1")
+
+        # Capa de muros para get_grid (segmentos entre centros de celda)
+        canvas = np.zeros((rows * 2 + 1, cols * 2 + 1), dtype=np.int32)
+        for (x, y), bits in np.ndenumerate(wall_bits):
+            cy, cx = y * 2 + 1, x * 2 + 1
+            if bits & WALL_TOP:
+                canvas[cy - 1, cx] = 1
+            if bits & WALL_BOTTOM:
+                canvas[cy + 1, cx] = 1
+            if bits & WALL_LEFT:
+                canvas[cy, cx - 1] = 1
+            if bits & WALL_RIGHT:
+                canvas[cy, cx + 1] = 1
+        # Borde exterior
+        canvas[0, :] = 1
+        canvas[-1, :] = 1
+        canvas[:, 0] = 1
+        canvas[:, -1] = 1
+
+        # Vecinos ortogonales dentro del tablero por celda [x][y]
+        # (mismo orden que get_neighborhood de Mesa con moore=False)
+        neighbor_table = [
+            [tuple((x + dx, y + dy) for dx, dy in ((-1, 0), (0, -1), (0, 1), (1, 0))
+                   if 0 <= x + dx < cols and 0 <= y + dy < rows)
+             for y in range(rows)]
+            for x in range(cols)
+        ]
+        # Los mismos vecinos con el bit WALL_* de la celda origen que los separa
+        neighbor_walls = [
+            [tuple((nb, WALL_MASKS[(nb[0] - x, nb[1] - y)][0]) for nb in neighbor_table[x][y])
+             for y in range(rows)]
+            for x in range(cols)
+        ]
 
         # Entradas (r,c) base 1 -> (x,y) base 0
-        self.entry_points = []
+        entry_points = []
         for e in cfg.get("entries", []):
             r, c = e["r"], e["c"]
-            self.entry_points.append((c - 1, r - 1))
+            entry_points.append((c - 1, r - 1))
+
+        return {
+            "wall_bits": wall_bits,
+            "wall_canvas": canvas,
+            "neighbor_table": neighbor_table,
+            "neighbor_walls": neighbor_walls,
+            "entry_points": tuple(entry_points),
+            # Para pruebas de pertenencia (la tupla se usa para elegir al azar)
+            "entry_points_set": frozenset(entry_points),
+        }
+
+    def _build_from_config(self, cfg, layout):
+        # Muros: copia propia, break_wall_between los modifica durante la partida
+        self.wall_bits = layout["wall_bits"].copy()    # WALL_* por celda [x, y]
+        self.wall_canvas = layout["wall_canvas"].copy()
+        # Solo lectura: se comparten entre modelos del mismo config
+        self.neighbor_table = layout["neighbor_table"]
+        self.neighbor_walls = layout["neighbor_walls"]  # [x][y] -> ((vecino, bit), ...)
+        self.entry_points = layout["entry_points"]      # ((x,y), ...)
+        self.entry_points_set = layout["entry_points_set"]
 
         # POIs
         for p in cfg.get("pois", []):
             r, c, kind = p["r"], p["c"], p["kind"]
             pos = (c - 1, r - 1)
             if kind == "v":
-                self.cell_contents[pos].append(Hostage(self.get_next_id()))
+                self.add_entity(Hostage(self.get_next_id()), pos)
             else:
-                self.cell_contents[pos].append(FalseAlarm(self.get_next_id()))
+                self.add_entity(FalseAlarm(self.get_next_id()), pos)
 
         # Disturbios (riots)
         for rr in cfg.get("riots", []):
             r, c = rr["r"], rr["c"]
             pos = (c - 1, r - 1)
-            self.cell_contents[pos].append(
-                Disturbance(self.get_next_id(), "mild"))
+            self.add_entity(Disturbance(self.get_next_id(), "mild"), pos)
 
         # Puertas
         for d in cfg.get("doors", []):
             r1, c1, r2, c2 = d["r1"], d["c1"], d["r2"], d["c2"]
             is_open = bool(d.get("open", False))
             pos1 = (c1 - 1, r1 - 1)
-            self.cell_contents[pos1].append(Gate(self.get_next_id(), is_open))
+            self.add_entity(Gate(self.get_next_id(), is_open), pos1)
 
     # ---------- utilidades juego ----------
     def get_next_id(self):
@@ -935,34 +931,108 @@ class RescueModel(Model):
         return self.next_entity_id
 
     def get_contents_at(self, pos):
-        return self.grid.get_cell_list_contents([pos]) + self.cell_contents.get(pos, [])
+        """
+        Devuelve (agentes, entidades) de 'pos' sin armar una lista nueva:
+        la de agent_cells y la de cell_contents.
+        No modificar ninguna de las dos.
+        """
+        cid = pos[0] * self.height + pos[1]
+        return self.agent_cells[cid], self.cell_contents[cid]
+
+    def find_first(self, pos, cls):
+        """Primer agente o entidad de tipo 'cls' en 'pos', o None."""
+        for group in self.get_contents_at(pos):
+            for c in group:
+                if isinstance(c, cls):
+                    return c
+        return None
+
+    def cell_id(self, pos):
+        """Índice de 'pos' en agent_cells y cell_contents."""
+        return pos[0] * self.height + pos[1]
+
+    def iter_cell_contents(self):
+        """(pos, entidades) de cada celda, en orden de cell_id."""
+        H = self.height
+        for cid, cont in enumerate(self.cell_contents):
+            yield divmod(cid, H), cont
+
+    def add_entity(self, entity, pos):
+        self.cell_contents[self.cell_id(pos)].append(entity)
+        if isinstance(entity, Disturbance):
+            self.disturbance_pos[entity] = pos
+        self.refresh_cell(pos)
 
     def remove_entity(self, entity, pos):
-        if pos in self.cell_contents and entity in self.cell_contents[pos]:
-            self.cell_contents[pos].remove(entity)
+        cont = self.cell_contents[self.cell_id(pos)]
+        if entity in cont:
+            cont.remove(entity)
+            self.disturbance_pos.pop(entity, None)
+            self.refresh_cell(pos)
+
+    def place_agent(self, agent, pos):
+        agent.pos = pos
+        self.agent_cells[self.cell_id(pos)].append(agent)
+
+    def move_agent(self, agent, pos):
+        # El llamador refresca ambas celdas (refresh_cell) tras el movimiento
+        self.agent_cells[self.cell_id(agent.pos)].remove(agent)
+        agent.pos = pos
+        self.agent_cells[self.cell_id(pos)].append(agent)
+
+    def refresh_cell(self, pos):
+        """
+        Recalcula el código de 'pos' en self.grid_state con la misma prioridad
+        que get_grid_board: agente > rehén > disturbio > falsa alarma > reja > entrada.
+        Debe llamarse tras cualquier cambio en la celda (mover agente, poner/quitar
+        entidad, cambio de severidad, abrir/cerrar reja).
+        """
+        cid = self.cell_id(pos)
+        cont = self.cell_contents[cid]
+        d = next((c for c in cont if isinstance(c, Disturbance)), None)
+        g = next((c for c in cont if isinstance(c, Gate)), None)
+        if self.agent_cells[cid]:
+            code = 2
+        elif any(isinstance(c, Hostage) for c in cont):
+            code = 3
+        elif d:
+            code = 8 if d.severity == "grave" else (
+                5 if d.severity == "active" else 4)
+        elif any(isinstance(c, FalseAlarm) for c in cont):
+            code = 7
+        elif g:
+            code = 9 if g.is_open else 10
+        elif pos in self.entry_points_set:
+            code = 6
+        else:
+            code = 0
+        y, x = pos[1], pos[0]
+        if self.grid_state[y, x] != code:
+            self.grid_state[y, x] = code
+            self._frame_delta[(y, x)] = code
+
+    def replay_frames(self):
+        """Tablero de cada tick (frame i == tick i) a partir de frame_base y frame_deltas."""
+        board = self.frame_base.copy()
+        frames = [board.copy()]
+        for delta in self.frame_deltas:
+            for yx, code in delta.items():
+                board[yx] = code
+            frames.append(board.copy())
+        return frames
 
     def can_move_to(self, from_pos, to_pos):
         x2, y2 = to_pos
-        if not (0 <= x2 < self.grid.width and 0 <= y2 < self.grid.height):
+        if not (0 <= x2 < self.width and 0 <= y2 < self.height):
             return False
 
-        x1, y1 = from_pos
-        dx, dy = x2 - x1, y2 - y1
-
         # Pared en origen
-        w = self.walls.get(from_pos, {})
-        if dx == 1 and w.get('right'):
-            return False
-        elif dx == -1 and w.get('left'):
-            return False
-        elif dy == 1 and w.get('bottom'):
-            return False
-        elif dy == -1 and w.get('top'):
+        if self.has_wall_between(from_pos, to_pos):
             return False
 
         # Puerta cerrada en destino bloquea
-        contents = self.get_contents_at(to_pos)
-        if any(isinstance(g, Gate) and not g.is_open for g in contents):
+        _, entities = self.get_contents_at(to_pos)
+        if any(isinstance(g, Gate) and not g.is_open for g in entities):
             return False
 
         return True
@@ -970,95 +1040,104 @@ class RescueModel(Model):
     def has_wall_between(self, pos1, pos2):
         x1, y1 = pos1
         x2, y2 = pos2
-        dx, dy = x2 - x1, y2 - y1
-        w = self.walls.get(pos1, {})
-        if dx == 1 and w.get('right'):
-            return True
-        elif dx == -1 and w.get('left'):
-            return True
-        elif dy == 1 and w.get('bottom'):
-            return True
-        elif dy == -1 and w.get('top'):
-            return True
-        return False
+        masks = WALL_MASKS.get((x2 - x1, y2 - y1))
+        return bool(masks and self.wall_bits[pos1] & masks[0])
+
+    def entry_cost(self, pos):
+        """
+        AP para entrar a 'pos' desde un vecino sin muro: None si hay reja cerrada,
+        2 con disturbio, 1 si no. Lo mismo que can_move_to + find_first(Disturbance)
+        en una sola pasada por la celda, para los bucles de vecinos.
+        """
+        cost = 1
+        for c in self.cell_contents[pos[0] * self.height + pos[1]]:
+            t = type(c)
+            if t is Gate:
+                if not c.is_open:
+                    return None
+            elif t is Disturbance:
+                cost = 2
+        return cost
 
     def break_wall_between(self, pos1, pos2):
         x1, y1 = pos1
         x2, y2 = pos2
-        dx, dy = x2 - x1, y2 - y1
-
-        w1 = self.walls.get(pos1, {})
-        w2 = self.walls.get(pos2, {})
-
-        if dx == 1 and w1.get('right'):
-            w1['right'] = False
-            w2['left'] = False
-        elif dx == -1 and w1.get('left'):
-            w1['left'] = False
-            w2['right'] = False
-        elif dy == 1 and w1.get('bottom'):
-            w1['bottom'] = False
-            w2['top'] = False
-        elif dy == -1 and w1.get('top'):
-            w1['top'] = False
-            w2['bottom'] = False
-
-        self.walls[pos1] = w1
-        self.walls[pos2] = w2
+        masks = WALL_MASKS.get((x2 - x1, y2 - y1))
+        if masks and self.wall_bits[pos1] & masks[0]:
+            bit, opposite = masks
+            self.wall_bits[pos1] &= ~bit & 0xFF
+            # El vecino puede quedar fuera del tablero (muro exterior)
+            if 0 <= x2 < self.width and 0 <= y2 < self.height:
+                self.wall_bits[pos2] &= ~opposite & 0xFF
+
+            # Actualiza solo el segmento de wall_canvas entre ambas celdas
+            sy, sx = y1 + y2 + 1, x1 + x2 + 1
+            if 0 < sy < self.wall_canvas.shape[0] - 1 and 0 < sx < self.wall_canvas.shape[1] - 1:
+                self.wall_canvas[sy, sx] = int(self.has_wall_between(pos1, pos2)
+                                               or self.has_wall_between(pos2, pos1))
 
         # Clear pathfinding cache when walls change
         self.clear_pathfinding_cache()
 
+    def next_u01(self):
+        """Siguiente U(0,1) del lote pre-muestreado; lo rellena al agotarse."""
+        i = self._u01_i
+        if i == len(self._u01):
+            self._u01 = self._u01_rng.random(U01_BATCH).tolist()
+            i = 0
+        self._u01_i = i + 1
+        return self._u01[i]
+
+    def next_index(self, n):
+        """Índice uniforme en [0, n) (sustituye random.choice / randrange)."""
+        return int(self.next_u01() * n)
+
     def get_available_cell(self):
         # libre de agente y de Gate cerrada
         for _ in range(200):
-            pos = (self.random.randrange(self.grid.width),
-                   self.random.randrange(self.grid.height))
-            cont = self.get_contents_at(pos)
-            has_agent = any(isinstance(c, TacticalAgent) for c in cont)
+            pos = (self.next_index(self.width),
+                   self.next_index(self.height))
+            agents, cont = self.get_contents_at(pos)
+            has_agent = bool(agents)
             has_closed_gate = any(isinstance(
                 c, Gate) and not c.is_open for c in cont)
             if not (has_agent or has_closed_gate):
                 return pos
         # fallback
-        return (self.random.randrange(self.grid.width), self.random.randrange(self.grid.height))
+        return (self.next_index(self.width), self.next_index(self.height))
 
     def place_passive_entity(self, entity_class):
         entity = entity_class(self.get_next_id(),
                               'mild') if entity_class == Disturbance else entity_class(self.get_next_id())
         pos = self.get_available_cell()
-        self.cell_contents[pos].append(entity)
+        self.add_entity(entity, pos)
 
     def count_hidden_markers(self):
-        return sum(1 for cont in self.cell_contents.values()
+        return sum(1 for cont in self.cell_contents
                    for it in cont if isinstance(it, (Hostage, FalseAlarm)))
 
     def maintain_minimum_markers(self):
         while self.count_hidden_markers() < self.min_hidden_markers:
-            cls = self.random.choices(
-                [Hostage, FalseAlarm], weights=[0.7, 0.3], k=1)[0]
+            cls = Hostage if self.next_u01() < 0.7 else FalseAlarm
             self.place_passive_entity(cls)
 
     def advance_disturbances(self):
-        # Progresión de disturbios
-        for pos, cont in list(self.cell_contents.items()):
-            ds = [d for d in cont if isinstance(d, Disturbance)]
-            for d in ds:
-                d.turns_in_current_state += 1
-                if d.severity == "mild" and d.turns_in_current_state >= 4:
-                    d.severity = "active"
-                    d.turns_in_current_state = 0
-                elif d.severity == "active" and d.turns_in_current_state >= 6:
-                    d.severity = "grave"
-                    self.handle_explosion(pos, cont)
+        # Progresión de disturbios (solo los vivos; una explosión los quita del registro)
+        for d, pos in list(self.disturbance_pos.items()):
+            d.turns_in_current_state += 1
+            if d.severity == "mild" and d.turns_in_current_state >= 4:
+                d.severity = "active"
+                d.turns_in_current_state = 0
+                self.refresh_cell(pos)
+            elif d.severity == "active" and d.turns_in_current_state >= 6:
+                d.severity = "grave"
+                self.handle_explosion(pos, self.cell_contents[self.cell_id(pos)])
 
         # 5% chance de nuevo disturbio
         if self.random.random() < 0.05:
             pos = self.get_available_cell()
-            cont = self.get_contents_at(pos)
-            if not any(isinstance(c, Disturbance) for c in cont):
-                self.cell_contents[pos].append(
-                    Disturbance(self.get_next_id(), "mild"))
+            if self.find_first(pos, Disturbance) is None:
+                self.add_entity(Disturbance(self.get_next_id(), "mild"), pos)
 
     def handle_explosion(self, pos, contents):
         self.structural_damage += 1
@@ -1073,8 +1152,8 @@ class RescueModel(Model):
 
         # Romper puertas cercanas
         for nb in neighbors:
-            if nb in self.cell_contents:
-                gs = [g for g in self.cell_contents[nb] if isinstance(g, Gate)]
+            if 0 <= nb[0] < self.width and 0 <= nb[1] < self.height:
+                gs = [g for g in self.cell_contents[self.cell_id(nb)] if isinstance(g, Gate)]
                 for g in gs:
                     if self.random.random() < 0.5:
                         self.remove_entity(g, nb)
@@ -1096,16 +1175,19 @@ class RescueModel(Model):
         # t del tick que vamos a resolver (1,2,3,...)
         t = self.turn_counter + 1
 
-        # Avanza agentes (ellos emiten eventos con t actual)
-        self.schedule.step()
+        # Avanza agentes en orden aleatorio (ellos emiten eventos con t actual)
+        self.random.shuffle(self.agent_list)
+        for a in self.agent_list:
+            a.step()
 
         # Sistema
         self.advance_disturbances()
         self.maintain_minimum_markers()
         self.check_game_over()
 
-        # DataCollector (para animación, frame i=t)
-        self.datacollector.collect(self)
+        # Cambios del tablero en este tick (frame i=t)
+        self.frame_deltas.append(self._frame_delta)
+        self._frame_delta = {}
 
         # Snapshot final del tick (estado que debería verse en frame t)
         self.logger.snapshot_tick(
@@ -1124,11 +1206,10 @@ class RescueModel(Model):
         if pos in self.revealed_pois:
             return False
 
-        contents = self.get_contents_at(pos)
         kind = None
-        if any(isinstance(c, Hostage) for c in contents):
+        if self.find_first(pos, Hostage):
             kind = "v"
-        elif any(isinstance(c, FalseAlarm) for c in contents):
+        elif self.find_first(pos, FalseAlarm):
             kind = "f"
 
         if kind is None:
@@ -1150,23 +1231,10 @@ matplotlib.rcParams['animation.embed_limit'] = 2**128
 print("Iniciando simulación desde config.json (6x8)...")
 model = RescueModel("config.json")
 
-# 1) Añade al DataCollector un snapshot con (id,r,c) por tick
-#    (si ya definiste DataCollector arriba, lo reemplazamos aquí)
-model.datacollector = DataCollector(
-    model_reporters={
-        "Grid": lambda m: np.array(get_grid_board(m)),
-        "AgentsRC": lambda m: sorted(
-            (str(a.unique_id), a.pos[1] + 1, a.pos[0] + 1)
-            for a in m.schedule.agents
-            if getattr(a, "pos", None) is not None
-        )
-    }
-)
-
-# 2) Colecta estado inicial (frame 0 / tick 0 snapshot)
-model.datacollector.collect(model)
-
-# 3) Corre la simulación
+# 1) El modelo guarda el tablero inicial y los cambios por tick (replay_frames)
+#    y el logger los agentes (id,r,c) por tick; ambos incluyen el estado inicial (t=0)
+
+# 2) Corre la simulación
 MAX_STEPS = 500
 for i in range(MAX_STEPS):
     if not model.running:
@@ -1186,18 +1254,18 @@ result = "win" if model.hostages_rescued >= 7 else ("lose_lost" if model.hostage
     "lose_collapse" if model.structural_damage >= 25 else "timeout"))
 print("RESULTADO:", result)
 
-# 4) Volcar log.json
+# 3) Volcar log.json
 simlog = model.logger.to_simlog(
     result, model.hostages_rescued, model.hostages_lost, model.structural_damage)
-with open("log.json", "w", encoding="utf-8") as f:
-    json.dump(simlog, f, ensure_ascii=False, indent=2)
+with open("log.json", "wb") as f:
+    f.write(orjson.dumps(simlog, option=orjson.OPT_INDENT_2))
 print("log.json generado en el directorio actual.")
 
-# 5) DIAGNÓSTICO: imprime los primeros 10 ticks
-results = model.datacollector.get_model_vars_dataframe()
-frames = [np.array(g) for g in results["Grid"]]  # copias seguras
+# 4) DIAGNÓSTICO: imprime los primeros 10 ticks
+frames = model.replay_frames()
 # lista de listas [(id,r,c), ...]
-agents_per_tick = list(results["AgentsRC"])
+agents_per_tick = [[(a["id"], a["r"], a["c"]) for a in snap["agents"]]
+                   for snap in model.logger.snapshots]
 
 # index de último tick simulado (frame index == tick)
 last_tick = len(agents_per_tick) - 1
@@ -1217,10 +1285,10 @@ for t in range(min(10, last_tick + 1)):
         [f"{k}:{v}" for k, v in sorted(types.items())]) or "—"
     print(f"t={t:>2} | eventos[{types_str}] | agentes[{snap_str}]")
 
-# 6) Animación (frame i == snapshot del tick i)
+# 5) Animación (frame i == snapshot del tick i)
 fig, ax = plt.subplots(figsize=(8, 6))
-ax.set_xticks(range(model.grid.width))
-ax.set_yticks(range(model.grid.height))
+ax.set_xticks(range(model.width))
+ax.set_yticks(range(model.height))
 ax.set_xticklabels([])
 ax.set_yticklabels([])
 ax.set_title("Simulación (6x8, sin muros dibujados)", fontsize=14)
@@ -1246,28 +1314,18 @@ plt.tight_layout()
 
 display(HTML(anim.to_jshtml()))
 
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 # Parámetros
 BATCH_SIZE = 100
 MAX_STEPS = 500
 
-wins = 0
-losses = 0
-timeouts = 0
-steps_total = 0
-
-for run in range(BATCH_SIZE):
-    model = RescueModel("config.json")
-    model.datacollector = DataCollector(
-        model_reporters={
-            "Grid": lambda m: np.array(get_grid_board(m)),
-            "AgentsRC": lambda m: sorted(
-                (str(a.unique_id), a.pos[1] + 1, a.pos[0] + 1)
-                for a in m.schedule.agents
-                if getattr(a, "pos", None) is not None
-            )
-        }
-    )
-    model.datacollector.collect(model)
+
+def _simulate_once(seed):
+    """Una corrida del lote; devuelve (pasos, "win" | "loss" | "timeout")."""
+    model = RescueModel("config.json", seed=seed)
 
     for i in range(MAX_STEPS):
         if not model.running:
@@ -1275,15 +1333,26 @@ for run in range(BATCH_SIZE):
         model.step()
 
     # Resultado de la corrida
-    steps_total += model.turn_counter
     if model.hostages_rescued >= 7:
-        wins += 1
+        outcome = "win"
     elif model.hostages_lost >= 4:
-        losses += 1
+        outcome = "loss"
     elif model.structural_damage >= 25:
-        losses += 1
+        outcome = "loss"
     else:
-        timeouts += 1
+        outcome = "timeout"
+    return model.turn_counter, outcome
+
+
+# Las corridas son independientes: una por proceso, con seed = número de corrida.
+# "fork" para que los workers hereden las clases definidas en el notebook.
+with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                         mp_context=multiprocessing.get_context("fork")) as pool:
+    results = list(pool.map(_simulate_once, range(BATCH_SIZE)))
+
+steps_total = sum(steps for steps, _ in results)
+outcomes = Counter(outcome for _, outcome in results)
+wins, losses, timeouts = outcomes["win"], outcomes["loss"], outcomes["timeout"]
 
 # Resumen final
 print("=" * 60)